@@ -11,13 +11,13 @@
 # Fixed ratio:
 #   left   = 33%
 #   right = 33%
-#   center = 33%
+#   center = remainder (its listed proportion is not used)
 #
 # Automatically balances cued/uncued within each line type.
 # ============================================================
 
+import numpy as np
 import polars as pl
-import random
 
 # -----------------------------
 # USER SETTINGS
@@ -36,49 +36,74 @@ line_conditions = {
     "center":      0.3333333333333  # 33%   
 }
 
-# -----------------------------
-# Calculate number of trials per condition
-# -----------------------------
-trials = []
-for line_type, proportion in line_conditions.items():
-    n_line = round(total_trials * proportion)
-    n_per_cue = n_line // len(cue_conditions)
 
-    for cue in cue_conditions:
-        for _ in range(n_per_cue):
-            trials.append({
-                "cueCondition": cue,
-                "lineCondition": line_type
-            })
+def generate_trials(total_trials, seed, cue_conditions=cue_conditions,
+                    line_conditions=line_conditions) -> pl.DataFrame:
+    """Return a shuffled, numbered trial table with exactly total_trials rows.
 
-# -----------------------------
-# Adjust if rounding made it off (keep total = 100)
-# -----------------------------
-while len(trials) < total_trials:
-    # randomly add to congruent/incongruent if under
-    cue = random.choice(cue_conditions)
-    line = random.choice(["congruent", "incongruent"])
-    trials.append({"cueCondition": cue, "lineCondition": line})
-while len(trials) > total_trials:
-    # randomly remove a center trial if overshoot
-    idx = next((i for i, t in enumerate(trials) if t["lineCondition"] == "center"), 0)
-    del trials[idx]
+    line_conditions maps line type -> proportion and must include "center".
+    The center proportion is not used: center gets whatever trials remain
+    after the side types, e.g. 36/32/32 for 100 trials at 1/3 each.
+    """
+    # Single seeded RNG for every random draw below
+    rng = np.random.default_rng(seed)
 
-# -----------------------------
-# Shuffle and number
-# -----------------------------
-random.seed(seed)
-random.shuffle(trials)
-for i, t in enumerate(trials, 1):
-    t["trial_num"] = i
+    # -----------------------------
+    # Calculate number of trials per condition
+    # -----------------------------
+    # Side line types are balanced across cues; center absorbs any rounding
+    # remainder so the total is exactly total_trials without a fix-up pass.
+    n_per_cue = {
+        lt: round(total_trials * p) // len(cue_conditions)
+        for lt, p in line_conditions.items() if lt != "center"
+    }
+    n_center = total_trials - len(cue_conditions) * sum(n_per_cue.values())
+    if n_center < 0:
+        raise ValueError(
+            f"side line proportions need {total_trials - n_center} trials, "
+            f"more than total_trials={total_trials}"
+        )
+    n_per_cue["center"] = n_center // len(cue_conditions)
 
-# -----------------------------
-# Save to CSV
-# -----------------------------
-df = pl.DataFrame(trials)
-df.write_csv(output_path)
+    # trials per (line type, cue) cell, rows/columns in factor order
+    line_types = list(line_conditions)
+    cell_counts = np.array([[n_per_cue[lt]] * len(cue_conditions) for lt in line_types])
+    # cues that receive one extra center trial when n_center is odd
+    extra_center_cues = rng.choice(
+        len(cue_conditions), size=n_center % len(cue_conditions), replace=False
+    )
+    cell_counts[line_types.index("center"), extra_center_cues] += 1
+
+    # Trials are built as int8 codes (indices into line_types / cue_conditions)
+    # and only mapped to strings when the DataFrame is constructed.
+    line_codes = np.repeat(np.arange(len(line_types), dtype=np.int8), cell_counts.sum(axis=1))
+    cue_codes = np.repeat(
+        np.tile(np.arange(len(cue_conditions), dtype=np.int8), len(line_types)),
+        cell_counts.ravel(),
+    )
+
+    # -----------------------------
+    # Shuffle and number
+    # -----------------------------
+    idx = rng.permutation(total_trials)
+    cue_codes = cue_codes[idx]
+    line_codes = line_codes[idx]
+
+    return pl.DataFrame({
+        "cueCondition": np.array(cue_conditions)[cue_codes],
+        "lineCondition": np.array(line_types)[line_codes],
+        "trial_num": np.arange(1, total_trials + 1),
+    })
+
+
+if __name__ == "__main__":
+    # -----------------------------
+    # Save to CSV
+    # -----------------------------
+    df = generate_trials(total_trials, seed)
+    df.write_csv(output_path)
 
-# Summary printout
-print(f"✅ Saved {len(df)} total trials to: {output_path}")
-print(df.group_by(["cueCondition", "lineCondition"]).len())
-print(df.head(8))
+    # Summary printout
+    print(f"✅ Saved {len(df)} total trials to: {output_path}")
+    print(df.group_by(["cueCondition", "lineCondition"]).len())
+    print(df.head(8))
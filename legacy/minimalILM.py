@@ -22,9 +22,14 @@ Response keys:
 """
 
 from psychopy import visual, core, event, monitors, data, gui
-import pandas as pd
+from psychopy.hardware import keyboard
+import polars as pl
+import numpy as np
 from numpy.random import randint
 import os
+import sys
+
+from conditionGenerator import generate_trials
 
 # --- Experiment metadata ---
 psychopyVersion = '2024.2.4'
@@ -55,17 +60,51 @@ if not os.path.exists(dataDir):
     os.makedirs(dataDir)
 filename = f"{dataDir}/{expInfo['participant']}_{expName}_{expInfo['date']}"
 
-# Create ExperimentHandler for data saving
-thisExp = data.ExperimentHandler(
-    name=expName, 
-    version='',
-    extraInfo=expInfo, 
-    runtimeInfo=None,
-    dataFileName=filename
+# --- Generate conditions (in memory; no CSV round-trip) ---
+conditions = generate_trials(
+    100,
+    seed=42,
+    cue_conditions=["uncued", "cued"],
+    line_conditions={"congruent": 1 / 3, "incongruent": 1 / 3, "center": 1 / 3},
+)
+
+# --- Precompute per-trial animation parameters ---
+is_congruent = pl.col("lineCondition") == "congruent"
+conditions = conditions.with_columns(
+    x_start=pl.when(is_congruent).then(4).otherwise(-4),
+    x_end=pl.when(is_congruent).then(-4).otherwise(4),
+    draw_instantly=pl.col("lineCondition") == "center",
 )
+trials = conditions.select(
+    "cueCondition", "lineCondition", "x_start", "x_end", "draw_instantly"
+).iter_rows()
+lineY = 1.1
+
+# --- Response buffers (filled per trial, written once at the end) ---
+n_trials = conditions.height
+resp_key = [None] * n_trials
+resp_rt = np.full(n_trials, np.nan)
+n_done = 0  # trials with a recorded response
+
+
+def save_data(n_done):
+    """Write the first n_done trials, plus expInfo columns, to filename.csv."""
+    pl.DataFrame({
+        "trial_n": np.arange(1, n_done + 1),
+        "cueCondition": conditions["cueCondition"][:n_done],
+        "lineCondition": conditions["lineCondition"][:n_done],
+        "response": pl.Series(values=resp_key[:n_done], dtype=pl.String),
+        "rt": pl.Series(values=resp_rt[:n_done], nan_to_null=True),
+    }).with_columns(
+        pl.lit(value).alias(name) for name, value in expInfo.items()
+    ).write_csv(filename + '.csv')
+
+
+def abort_experiment():
+    """Quit (bound to escape); the trial loop's finally saves completed trials."""
+    win.close()
+    core.quit()
 
-# --- Load conditions ---
-trials = pd.read_csv("illusory_line_conditions_100.csv").to_dict("records")
 
 # --- Define monitor manually ---
 mon = monitors.Monitor("MBP_M3Max")  # name is arbitrary
@@ -91,16 +130,32 @@ if actual_fps is not None:
     print(f"Measured frame rate: {actual_fps:.2f} Hz")
 else:
     print("Warning: Could not measure frame rate reliably")
+    actual_fps = 60.0  # assume a standard 60 Hz display
+
+# Fixed intervals as whole frames so each phase is locked to the refresh
+FRAMES_BASELINE = round(1.0 * actual_fps)
+FRAMES_CUE = round(0.05 * actual_fps)
+FRAMES_BLANK = round((SOA - 0.05) * actual_fps)
+FRAMES_ITI = round(0.5 * actual_fps)
+duration = 8.0 / LINE_SPEED  # every sweep spans 8 deg (x = -4 to 4)
+N_LINE_FRAMES = max(1, int(np.ceil(duration * actual_fps)))
 
 # --- Stimuli ---
 fixation = visual.ShapeStim(win, vertices='cross', size=(0.6, 0.6), lineColor='white')
-cue = visual.Circle(win, radius=1, fillColor='white', lineColor='white')
+cue_left = visual.Circle(win, radius=1, pos=(-4, 1.1), fillColor='white', lineColor='white')
+cue_right = visual.Circle(win, radius=1, pos=(4, 1.1), fillColor='white', lineColor='white')
 L_circle = visual.Circle(win, radius=0.5, pos=(-4, 1.1), fillColor='white')
 R_circle = visual.Circle(win, radius=0.5, pos=(4, 1.1), fillColor='white')
 line = visual.Line(win, lineColor='white', lineWidth=3)
 
-# --- Timing control ---
-clock = core.Clock()
+# Pre-render the static background (fixation + placeholders) into one texture
+bg = visual.BufferImageStim(win, stim=[fixation, L_circle, R_circle])
+
+# --- Keyboard (buffered in a background thread; timestamps from kb.clock) ---
+kb = keyboard.Keyboard()
+
+# Escape quits from anywhere; checked by PsychoPy on each flip, not polled here
+event.globalKeys.add(key='escape', func=abort_experiment)
 
 # --- Instructions Screen ---
 instructions_text = visual.TextStim(
@@ -126,120 +181,89 @@ Press ESC at any time to quit""",
 
 instructions_text.draw()
 win.flip()
-event.waitKeys(keyList=['space', 'escape'])
-
-# Check if they pressed escape
-if event.getKeys(['escape']):
-    win.close()
-    core.quit()
+event.waitKeys(keyList=['space'])  # escape is handled by the global key
 
 # --- Run trials ---
-for i, trial in enumerate(trials, start=1):
-    cueCondition = trial["cueCondition"]
-    lineCondition = trial["lineCondition"]
-
-    # --- Set cue position ---
-    cue.pos = (4, 1.1) if cueCondition == "cued" else (-4, 1.1)
-
-    # --- Set line parameters ---
-    lineY = 1.1
-    if lineCondition == "congruent":
-        x_start, x_end, draw_instantly = 4, -4, False
-    elif lineCondition == "incongruent":
-        x_start, x_end, draw_instantly = -4, 4, False
-    else:  # center
-        x_start, x_end, draw_instantly = -4, 4, True
-
-    line.start = (x_start, lineY)
-    line.end = (x_start, lineY)
-
-    # --- Draw fixation & circles ---
-    fixation.draw()
-    L_circle.draw()
-    R_circle.draw()
-    win.flip()
-    core.wait(1.0)  # 1 second baseline
-
-    # --- Draw cue for 50ms ---
-    cue.draw()
-    L_circle.draw()
-    R_circle.draw()
-    fixation.draw()
-    win.flip()
-    core.wait(0.05)  # cue visible for 50ms
-    
-    # --- Blank period (rest of SOA) ---
-    L_circle.draw()
-    R_circle.draw()
-    fixation.draw()
-    win.flip()
-    core.wait(SOA - 0.05)  # SOA minus the 50ms cue duration
-
-    # --- Draw line animation ---
-    speed = LINE_SPEED  # deg/sec (configurable in dialog)
-    distance = abs(x_end - x_start)
-    duration = distance / speed
-    clock.reset()
-
-    while True:
-        # Check for escape key
-        if event.getKeys(['escape']):
-            win.close()
-            core.quit()
-        
-        t = clock.getTime()
+# Bound methods used in the per-frame trial loops, looked up once
+bg_draw = bg.draw
+line_draw = line.draw
+win_flip = win.flip
+
+log_rows = []  # per-trial summaries, printed after the experiment
+# Saved in finally so completed trials survive escape (core.quit raises
+# SystemExit), a closed window or a crash, not just normal completion
+try:
+    for i, (cueCondition, lineCondition, x_start, x_end, draw_instantly) in enumerate(trials, start=1):
+        # --- Pick the cue stimulus for this trial ---
+        cue = cue_right if cueCondition == "cued" else cue_left
+
+        # start stays fixed for the whole sweep; only the end point moves
+        line.start = (x_start, lineY)
+        end_buf = np.array([x_start, lineY], dtype=np.float32)
+        line.end = end_buf
+
+        # --- Draw fixation & circles ---
+        for _ in range(FRAMES_BASELINE):  # 1 second baseline
+            bg_draw()
+            win_flip()
+
+        # --- Draw cue for 50ms ---
+        for _ in range(FRAMES_CUE):  # cue visible for 50ms
+            bg_draw()
+            cue.draw()
+            win_flip()
+
+        # --- Blank period (rest of SOA) ---
+        for _ in range(FRAMES_BLANK):  # SOA minus the 50ms cue duration
+            bg_draw()
+            win_flip()
+
+        # --- Draw line animation ---
+        # Precomputed end-point trajectory, one x position per frame; the start
+        # point is dropped so the sweep lasts N_LINE_FRAMES frames and ends at x_end
         if draw_instantly:
-            line.start = (x_start, lineY)
-            line.end = (x_end, lineY)
-            line.draw()
-            fixation.draw()
-            L_circle.draw()
-            R_circle.draw()
-            win.flip()
-            break
+            xs = (x_end,)
         else:
-            progress = min(t / duration, 1.0)  # 0.0 to 1.0 (complete line)
-            current_x = x_start + (x_end - x_start) * progress
-            line.start = (x_start, lineY)
-            line.end = (current_x, lineY)
-            line.draw()
-            fixation.draw()
-            L_circle.draw()
-            R_circle.draw()
-            win.flip()
-            if progress >= 1.0:
-                break
-
-    # --- Record response ---
-    clock.reset()
-    keys = event.waitKeys(maxWait=2, keyList=['q', 'p', 'escape'], timeStamped=clock)
-    
-    # Check if escape was pressed
-    if keys and keys[0][0] == 'escape':
-        thisExp.abort()  # save data before quitting
-        win.close()
-        core.quit()
-    
-    rt = None if keys is None else keys[0][1]
-    key = None if keys is None else keys[0][0]
-    
-    # Save trial data
-    thisExp.addData('trial_n', i)
-    thisExp.addData('cueCondition', cueCondition)
-    thisExp.addData('lineCondition', lineCondition)
-    thisExp.addData('response', key)
-    thisExp.addData('rt', rt)
-    thisExp.nextEntry()
-    
-    print(f"Trial {i:03d}: cue={cueCondition}, line={lineCondition}, key={key}, rt={rt:.3f}s" if rt else f"Trial {i:03d}: cue={cueCondition}, line={lineCondition}, key={key}, rt=None")
-
-    # Clear screen for inter-trial interval
-    win.flip()  # blank screen
-    core.wait(0.5)
+            xs = np.linspace(x_start, x_end, N_LINE_FRAMES + 1, dtype=np.float32)[1:]
+
+        for cur_x in xs:
+            end_buf[0] = cur_x
+            line.end = end_buf
+            bg_draw()
+            line_draw()
+            win_flip()
+
+        # --- Record response ---
+        kb.clock.reset()
+        keys = kb.waitKeys(maxWait=2, keyList=['q', 'p', 'escape'], waitRelease=False)
+
+        # Check if escape was pressed
+        if keys and keys[0].name == 'escape':
+            abort_experiment()
+
+        rt = keys[0].rt if keys else None
+        key = keys[0].name if keys else None
+
+        # Save trial data
+        resp_key[i - 1] = key
+        resp_rt[i - 1] = np.nan if rt is None else rt
+        n_done = i
+
+        log_rows.append((i, cueCondition, lineCondition, key, rt))
+
+        # Clear screen for inter-trial interval
+        for _ in range(FRAMES_ITI):  # blank screen
+            win_flip()
+finally:
+    if n_done:
+        save_data(n_done)
 
 # --- End experiment ---
-thisExp.saveAsWideText(filename + '.csv')
-thisExp.saveAsPickle(filename)
+sys.stdout.write("\n".join(
+    f"Trial {i:03d}: cue={cue_c}, line={line_c}, key={key}, "
+    + (f"rt={rt:.3f}s" if rt else "rt=None")
+    for i, cue_c, line_c, key, rt in log_rows
+) + "\n")
 print(f"\nData saved to: {filename}.csv")
 win.close()
 core.quit()
\ No newline at end of file